@@ -12,6 +12,8 @@
 Test support, providing the ability to run the event loop from tests.
 """
 
+import asyncio
+
 from traits_futures.i_event_loop_helper import IEventLoopHelper
 
 
@@ -88,35 +90,31 @@ class EventLoopHelper:
             If timeout is reached, regardless of whether the condition is
             true or not at that point.
         """
-        timed_out = []
-
         event_loop = self._event_loop
 
-        def stop_on_timeout():
-            timed_out.append(True)
-            event_loop.stop()
+        # Future that's marked done the first time the condition is seen to
+        # be true; waiting on it replaces explicit stop / timer juggling.
+        condition_met = event_loop.create_future()
 
-        def stop_if_condition(event):
-            if condition(object):
-                event_loop.stop()
+        def set_if_condition(event):
+            if not condition_met.done() and condition(object):
+                condition_met.set_result(None)
 
-        object.observe(stop_if_condition, trait)
+        object.observe(set_if_condition, trait)
         try:
             # The condition may have become True before we
             # started listening to changes. So start with a check.
             if not condition(object):
-                timer_handle = event_loop.call_later(timeout, stop_on_timeout)
                 try:
-                    event_loop.run_forever()
-                finally:
-                    timer_handle.cancel()
+                    event_loop.run_until_complete(
+                        asyncio.wait_for(condition_met, timeout)
+                    )
+                except asyncio.TimeoutError:
+                    raise RuntimeError(
+                        "run_until timed out after {} seconds. "
+                        "At timeout, condition was {}.".format(
+                            timeout, condition(object)
+                        )
+                    ) from None
         finally:
-            object.observe(stop_if_condition, trait, remove=True)
-
-        if timed_out:
-            raise RuntimeError(
-                "run_until timed out after {} seconds. "
-                "At timeout, condition was {}.".format(
-                    timeout, condition(object)
-                )
-            )
+            object.observe(set_if_condition, trait, remove=True)
@@ -22,11 +22,35 @@ from traits_futures.multiprocessing_router import MultiprocessingRouter
 class MultiprocessingContext(IParallelContext):
     """
     Context for multiprocessing, suitable for use with the TraitsExecutor.
+
+    Parameters
+    ----------
+    local_queue_maxsize : int, optional
+        Maximum number of messages held in the main process awaiting
+        routing, for routers created by this context. If zero (the default),
+        the number of messages is unbounded.
+        Batches from buffering senders may be larger than this bound: their
+        messages are then handed over as space becomes available.
+    sender_batch_size : int, optional
+        Number of messages each sender buffers before putting them onto the
+        process queue in one operation. The default of 1 disables buffering.
+    sender_flush_interval : float, optional
+        If given, the maximum time in seconds that a buffering sender waits
+        between flushes, checked whenever it sends a message.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        *,
+        local_queue_maxsize=0,
+        sender_batch_size=1,
+        sender_flush_interval=None,
+    ):
         self._closed = False
         self._manager = multiprocessing.Manager()
+        self._local_queue_maxsize = local_queue_maxsize
+        self._sender_batch_size = sender_batch_size
+        self._sender_flush_interval = sender_flush_interval
 
     def worker_pool(self, *, max_workers=None):
         """
@@ -74,6 +98,9 @@ class MultiprocessingContext(IParallelContext):
         return MultiprocessingRouter(
             event_loop=event_loop,
             manager=self._manager,
+            local_queue_maxsize=self._local_queue_maxsize,
+            sender_batch_size=self._sender_batch_size,
+            sender_flush_interval=self._sender_flush_interval,
         )
 
     def close(self):
@@ -22,13 +22,18 @@ following machinery:
   queue runs in its own manager server process (the manager is
   :attr:`MultiprocessingRouter.manager`), and the main process and worker
   processes use proxy objects to communicate with the queue.
-- A thread-safe local message queue in the main process.
+- A thread-safe local message queue in the main process. This queue is
+  unbounded by default; if :attr:`MultiprocessingRouter.local_queue_maxsize`
+  is set, the monitor thread blocks while the queue is full, so a stalled
+  main thread can't cause the queue to grow without limit.
 - A long-running thread running in the main process, that continually monitors
   the process message queue and immediately transfers any messages that arrive
   to the local message queue.
 - A :class:`~.IPingee` instance that's pinged by the monitor thread whenever a
   message is transferred from the process message queue to the local message
-  queue, alerting the GUI that there's a message to process and route.
+  queue, alerting the GUI that there's a message to process and route. Pings
+  are coalesced: while a ping is pending, further transfers don't send
+  another one.
 
 When a worker process uses the sender to send a message, the following steps
 occur:
@@ -37,17 +42,16 @@ occur:
   local proxy for that message queue)
 - the monitor thread receives the message (using *its* local proxy for the
   process message queue) and places the message onto the local message queue.
-  It also pings the pingee.
+  It also pings the pingee, if there isn't already a ping pending.
 - assuming a running event loop, the pingee receives the ping and executes
-  the ``MultiprocessingRouter._route_message`` callback
-- the ``_route_message`` callback pulls the next message from the local message
-  queue, inspects it to determine which receiver it should be sent to, and
-  sends it to that receiver
+  the ``MultiprocessingRouter._route_pending_messages`` callback
+- the ``_route_pending_messages`` callback pulls messages from the local
+  message queue (those present when the callback starts), inspects each to
+  determine which receiver it should be sent to, and sends it to that
+  receiver
 
 """
 
-import collections.abc
-import itertools
 import logging
 import multiprocessing.managers
 import queue
@@ -57,13 +61,14 @@ import time
 from traits.api import (
     Any,
     Bool,
-    Dict,
     Event,
+    Float,
     HasRequiredTraits,
     HasStrictTraits,
     Instance,
     Int,
     provides,
+    Union,
 )
 
 from traits_futures.i_event_loop import IEventLoop
@@ -101,12 +106,28 @@ class MultiprocessingSender:
         Id of the matching receiver; used for message routing.
     message_queue : multiprocessing.Queue
         Process-safe queue for passing messages to the foreground.
+    batch_size : int, optional
+        Number of messages to buffer before putting them onto the message
+        queue in a single operation. The default of 1 sends each message
+        immediately.
+    flush_interval : float, optional
+        If given, a buffered send also flushes the buffer when at least
+        this many seconds have passed since the last flush. Buffered
+        messages are always flushed when the sender is stopped. Ignored
+        if ``batch_size`` is 1.
     """
 
-    def __init__(self, connection_id, message_queue):
+    def __init__(
+        self, connection_id, message_queue, batch_size=1, flush_interval=None
+    ):
         self.connection_id = connection_id
         self.message_queue = message_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
         self._state = _INITIAL
+        self._buffer = None
+        self._last_flush = None
+        self._put = None
 
     def start(self):
         """
@@ -128,8 +149,19 @@ class MultiprocessingSender:
                 f"Sender already started: state is {self._state}"
             )
 
+        self._buffer = [self.connection_id]
+        self._last_flush = time.monotonic()
+        self._put = self.message_queue.put
         self._state = _OPEN
 
+        # While the sender is open, shadow the 'send' method with the
+        # appropriate implementation, so that the state check in 'send'
+        # isn't repeated for every message.
+        if self.batch_size == 1:
+            self.send = self._send_single
+        else:
+            self.send = self._send_buffered
+
     def send(self, message):
         """
         Send a message to the router.
@@ -153,7 +185,9 @@ class MultiprocessingSender:
                 f"state is {self._state}"
             )
 
-        self.message_queue.put((self.connection_id, message))
+        # Only reachable through an explicit class-level call: while the
+        # sender is open, this method is shadowed on the instance.
+        self.send(message)
 
     def stop(self):
         """
@@ -175,8 +209,43 @@ class MultiprocessingSender:
                 f"state is {self._state}"
             )
 
+        if len(self._buffer) > 1:
+            self._flush()
+        del self.send
+        self._buffer = None
+        self._last_flush = None
+        self._put = None
         self._state = _CLOSED
 
+    def _send_single(self, message):
+        """
+        Implementation of 'send' for an open, unbuffered sender.
+        """
+        self._put((self.connection_id, message))
+
+    def _send_buffered(self, message):
+        """
+        Implementation of 'send' for an open, buffering sender.
+        """
+        buffer = self._buffer
+        buffer.append(message)
+        if len(buffer) > self.batch_size or (
+            self.flush_interval is not None
+            and time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self._flush()
+
+    def _flush(self):
+        """
+        Put all buffered messages onto the message queue, as a single list.
+
+        The list holds the connection id followed by the messages, so that
+        the connection id is only sent once per batch.
+        """
+        self._put(self._buffer)
+        self._buffer = [self.connection_id]
+        self._last_flush = time.monotonic()
+
     def __enter__(self):
         self.start()
         return self
@@ -211,6 +280,17 @@ class MultiprocessingRouter(HasRequiredTraits):
         The event loop used to trigger message dispatch.
     manager : multiprocessing.managers.SyncManager
         Manager to be used for creating the shared-process queue.
+    local_queue_maxsize : int, optional
+        Maximum number of messages held in the main process awaiting
+        routing. If zero (the default), the number of messages is unbounded.
+        Batches from buffering senders may be larger than this bound: their
+        messages are then handed over as space becomes available.
+    sender_batch_size : int, optional
+        Number of messages each sender buffers before putting them onto the
+        process queue in one operation. The default of 1 disables buffering.
+    sender_flush_interval : float, optional
+        If given, the maximum time in seconds that a buffering sender waits
+        between flushes, checked whenever it sends a message.
     """
 
     def start(self):
@@ -230,9 +310,20 @@ class MultiprocessingRouter(HasRequiredTraits):
         if self._running:
             raise RuntimeError("Router is already running")
 
-        self._local_message_queue = queue.Queue()
+        if self.local_queue_maxsize:
+            self._local_message_queue = queue.Queue(
+                maxsize=self.local_queue_maxsize
+            )
+        else:
+            self._local_message_queue = queue.SimpleQueue()
+        self._ping_pending = threading.Event()
         self._link_to_event_loop()
 
+        # Note: a plain multiprocessing.Queue would avoid the round trip to
+        # the manager process, but it can't be used here: senders reach
+        # workers as task arguments, and multiprocessing.Queue objects can
+        # only be shared through inheritance, not pickled into a running
+        # worker pool.
         self._process_message_queue = self.manager.Queue()
         self._monitor_thread = threading.Thread(
             target=monitor_queue,
@@ -240,12 +331,13 @@ class MultiprocessingRouter(HasRequiredTraits):
                 self._process_message_queue,
                 self._local_message_queue,
                 self._pingee,
+                self._ping_pending,
             ),
         )
         self._monitor_thread.start()
 
         self._running = True
-        logger.debug(f"{self} started")
+        logger.debug("%s started", self)
 
     def stop(self):
         """
@@ -268,11 +360,19 @@ class MultiprocessingRouter(HasRequiredTraits):
             raise RuntimeError("Router is not running")
 
         if self._receivers:
-            logger.warning(f"{self} has {len(self._receivers)} unclosed pipes")
+            logger.warning(
+                "%s has %s unclosed pipes", self, len(self._receivers)
+            )
 
         # Shut everything down in reverse order.
         # First the monitor thread.
         self._process_message_queue.put(None)
+        # The monitor thread forwards the sentinel to the local queue as it
+        # exits. Discard any undelivered messages up to that point: if the
+        # local queue is bounded, the monitor thread may be blocked waiting
+        # for space.
+        while self._local_message_queue.get() is not None:
+            pass
         self._monitor_thread.join()
         self._monitor_thread = None
 
@@ -285,9 +385,10 @@ class MultiprocessingRouter(HasRequiredTraits):
         self._unlink_from_event_loop()
 
         self._local_message_queue = None
+        self._ping_pending = None
 
         self._running = False
-        logger.debug(f"{self} stopped")
+        logger.debug("%s stopped", self)
 
     def pipe(self):
         """
@@ -313,16 +414,22 @@ class MultiprocessingRouter(HasRequiredTraits):
         if not self._running:
             raise RuntimeError("Router is not running.")
 
-        connection_id = next(self._connection_ids)
+        connection_id = self._next_connection_id
+        self._next_connection_id = connection_id + 1
 
         sender = MultiprocessingSender(
             connection_id=connection_id,
             message_queue=self._process_message_queue,
+            batch_size=self.sender_batch_size,
+            flush_interval=self.sender_flush_interval,
         )
         receiver = MultiprocessingReceiver(connection_id=connection_id)
         self._receivers[connection_id] = receiver
         logger.debug(
-            f"{self} created pipe #{connection_id} with receiver {receiver}"
+            "%s created pipe #%s with receiver %s",
+            self,
+            connection_id,
+            receiver,
         )
         return sender, receiver
 
@@ -351,7 +458,10 @@ class MultiprocessingRouter(HasRequiredTraits):
         connection_id = receiver.connection_id
         self._receivers.pop(connection_id)
         logger.debug(
-            f"{self} closed pipe #{connection_id} with receiver {receiver}"
+            "%s closed pipe #%s with receiver %s",
+            self,
+            connection_id,
+            receiver,
         )
 
     def route_until(self, condition, timeout=None):
@@ -388,8 +498,13 @@ class MultiprocessingRouter(HasRequiredTraits):
             end_time = time.monotonic() + timeout
             try:
                 while not condition():
-                    time_remaining = end_time - time.monotonic()
-                    self._route_message(block=True, timeout=time_remaining)
+                    # Only consult the clock when we actually need to wait:
+                    # messages that are already queued are routed directly.
+                    try:
+                        self._route_message()
+                    except queue.Empty:
+                        time_remaining = max(end_time - time.monotonic(), 0.0)
+                        self._route_message(block=True, timeout=time_remaining)
             except queue.Empty:
                 raise RuntimeError("Timed out waiting for messages")
 
@@ -401,26 +516,49 @@ class MultiprocessingRouter(HasRequiredTraits):
     #: Manager, used to create message queues.
     manager = Instance(multiprocessing.managers.BaseManager, required=True)
 
+    #: Maximum number of messages held in the main process awaiting routing.
+    #: If zero, the number of messages is unbounded.
+    #: This may be smaller than sender_batch_size: the monitor thread then
+    #: transfers each batch as space becomes available.
+    local_queue_maxsize = Int(0)
+
+    #: Number of messages each sender buffers before putting them onto the
+    #: process queue in one operation. 1 means no buffering.
+    sender_batch_size = Int(1)
+
+    #: If not None, a buffering sender also flushes when it sends a message
+    #: at least this many seconds after its previous flush.
+    sender_flush_interval = Union(None, Float())
+
     # Private traits ##########################################################
 
     #: Queue receiving messages from child processes.
     _process_message_queue = Any()
 
     #: Local queue for messages to the UI thread.
-    _local_message_queue = Instance(queue.Queue)
+    _local_message_queue = Any()
 
     #: Thread transferring messages from the process queue to the local queue.
     _monitor_thread = Any()
 
-    #: Source of new connection ids.
-    _connection_ids = Instance(collections.abc.Iterator)
+    #: Connection id to use for the next pipe created. Ids are never reused:
+    #: messages from a closed pipe may still be in flight, and must be
+    #: discarded rather than delivered to a newer receiver.
+    _next_connection_id = Int(0)
 
-    #: Receivers, keyed by connection_id.
-    _receivers = Dict(Int(), Instance(MultiprocessingReceiver))
+    #: Receivers, keyed by connection_id. This is a plain dict rather than a
+    #: Dict trait, to avoid the overhead of trait validation and notification
+    #: on the message routing path.
+    _receivers = Any()
 
     #: Receiver for the "message_sent" signal.
     _pingee = Instance(IPingee)
 
+    #: Event set by the monitor thread when it pings, and cleared when
+    #: the resulting callback starts routing messages. Used to avoid
+    #: sending redundant pings.
+    _ping_pending = Instance(threading.Event)
+
     #: Bool keeping track of whether we're linked to the event loop
     #: or not.
     _linked = Bool(False)
@@ -439,7 +577,9 @@ class MultiprocessingRouter(HasRequiredTraits):
             # so if we ever get here then something likely needs fixing.
             raise RuntimeError("Already linked to the event loop")
 
-        self._pingee = self.event_loop.pingee(on_ping=self._route_message)
+        self._pingee = self.event_loop.pingee(
+            on_ping=self._route_pending_messages
+        )
         self._pingee.connect()
         self._linked = True
 
@@ -461,6 +601,31 @@ class MultiprocessingRouter(HasRequiredTraits):
             self._pingee.disconnect()
             self._linked = False
 
+    def _route_pending_messages(self):
+        """
+        Dispatch the messages currently in the local message queue.
+
+        This is the callback for pings from the monitor thread.
+        """
+        # Clear the flag before routing, so that any message transferred
+        # from this point on results in a new ping.
+        self._ping_pending.clear()
+        # Only route the messages present on entry: anything arriving later
+        # has its own ping, and will be handled in a later callback. That
+        # keeps a steady stream of messages from starving the event loop.
+        for _ in range(self._local_message_queue.qsize()):
+            # A receiver may stop the router, or switch it to manual mode,
+            # while we're routing. If so, leave any remaining messages alone.
+            if not self._linked:
+                break
+            # A receiver may also run a nested event loop (for example, by
+            # showing a modal dialog), which can route the remaining messages
+            # before we get to them.
+            try:
+                self._route_message()
+            except queue.Empty:
+                break
+
     def _route_message(self, *, block=False, timeout=None):
         """
         Get and dispatch a message from the local message queue.
@@ -469,71 +634,108 @@ class MultiprocessingRouter(HasRequiredTraits):
         ----------
         block : bool, optional
             If True, block until either a message arrives or until timeout. If
-            False (the default), we expect a message to already be present in
-            the queue.
+            False (the default), raise immediately if there's no message
+            present in the queue.
         timeout : float, optional
-            Maximum time to wait for a message to arrive. If no timeout
-            is given and ``block`` is True, wait indefinitely. If ``block``
-            is False, this parameter is ignored.
+            Maximum time to wait for a message to arrive. Must be
+            non-negative if given. If no timeout is given and ``block`` is
+            True, wait indefinitely. If ``block`` is False, this parameter is
+            ignored.
 
         Raises
         ------
         queue.Empty
-            If no message arrives within the given timeout.
+            If no message is available (when not blocking), or if no message
+            arrives within the given timeout.
         """
         connection_id, message = self._local_message_queue.get(
-            block=block,
-            timeout=None if timeout is None else max(timeout, 0.0),
+            block=block, timeout=timeout
         )
-        try:
-            receiver = self._receivers[connection_id]
-        except KeyError:
+        receiver = self._receivers.get(connection_id)
+        if receiver is None:
             logger.warning(
-                f"{self} discarding message from closed pipe #{connection_id}."
+                "%s discarding message from closed pipe #%s.",
+                self,
+                connection_id,
             )
         else:
             receiver.message = message
 
-    def __connection_ids_default(self):
-        return itertools.count()
+    def __receivers_default(self):
+        return {}
 
 
-def monitor_queue(process_queue, local_queue, pingee):
+def monitor_queue(process_queue, local_queue, pingee, ping_pending):
     """
     Move incoming child process messages to the local queue.
 
     Monitors the process queue for incoming messages, and transfers
-    those messages to the local queue. For each message transferred,
-    pings the event loop using the pingee to notify it that there's
-    a message to be processed.
+    those messages to the local queue. After each transfer, pings the
+    event loop using the pingee to notify it that there are messages
+    to be processed, unless a previous ping is still pending.
 
-    To stop the thread, put ``None`` onto the process_queue.
+    To stop the thread, put ``None`` onto the process_queue. On exit, the
+    thread puts ``None`` onto the local queue, to signal that no further
+    messages will be transferred.
 
     Parameters
     ----------
     process_queue : multiprocessing.Queue
-        Queue to listen to for messages.
-    local_queue : queue.Queue
-        Queue to transfer those messages to.
+        Queue to listen to for messages. Each queue item is either a single
+        ``(connection_id, message)`` pair or a list consisting of a
+        connection id followed by one or more messages for that connection.
+    local_queue : queue.SimpleQueue or queue.Queue
+        Queue to transfer those messages to. If this queue is bounded,
+        transfers block while it's full, after making sure that a ping is
+        pending.
     pingee : IPingee
         Recipient for pings, used to notify the event loop that there's
         a message pending.
+    ping_pending : threading.Event
+        Event that's set when a ping is sent, and cleared by the recipient
+        of that ping before it processes messages.
 
     """
     pinger = pingee.pinger()
     pinger.connect()
     try:
-        while True:
+        # Look up the bound methods once, rather than once per message.
+        get, put, ping = process_queue.get, local_queue.put, pinger.ping
+        put_nowait = local_queue.put_nowait
+        is_ping_pending = ping_pending.is_set
+
+        def transfer(item):
             try:
-                message = process_queue.get(block=True, timeout=1.0)
-            except queue.Empty:
-                continue
+                put_nowait(item)
+            except queue.Full:
+                # A bounded local queue is full. Make sure the main thread
+                # has been asked to drain it before blocking: otherwise a
+                # batch larger than the queue could block here forever.
+                if not is_ping_pending():
+                    ping_pending.set()
+                    ping()
+                put(item)
+
+        while True:
+            message = get()
             if message is None:
                 break
-            local_queue.put(message)
+            if type(message) is list:
+                # Batch of messages from a buffering sender: the connection
+                # id, followed by the messages themselves.
+                connection_id = message[0]
+                for index in range(1, len(message)):
+                    transfer((connection_id, message[index]))
+            else:
+                transfer(message)
             # Avoid hanging onto a reference to the message until the next
-            # queue element arrives.
+            # queue element arrives. Note that a "for message in iter(...)"
+            # loop would keep the name bound while blocking in the next get,
+            # so an explicit del is still needed with that form.
             del message
-            pinger.ping()
+            if not is_ping_pending():
+                ping_pending.set()
+                ping()
     finally:
         pinger.disconnect()
+        local_queue.put(None)
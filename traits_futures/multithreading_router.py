@@ -13,16 +13,14 @@ Implementations of the IMessageSender, IMessageReceiver and IMessageRouter
 interfaces for tasks executed on a background thread.
 """
 
-import collections.abc
-import itertools
 import logging
 import queue
+import threading
 import time
 
 from traits.api import (
     Any,
     Bool,
-    Dict,
     Event,
     HasRequiredTraits,
     HasStrictTraits,
@@ -67,16 +65,34 @@ class MultithreadingSender:
     pingee : IPingee
         Recipient for pings, used to notify the event loop that there's
         a message pending.
-    message_queue : queue.Queue
+    message_queue : queue.SimpleQueue
         Thread-safe queue for passing messages to the foreground.
+    ping_pending : threading.Event
+        Event shared by all senders for a router. It's set when a sender
+        pings, and cleared by the recipient of that ping before it processes
+        messages. While it's set, senders don't send further pings.
     """
 
-    def __init__(self, connection_id, pingee, message_queue):
+    __slots__ = (
+        "connection_id",
+        "pingee",
+        "message_queue",
+        "ping_pending",
+        "pinger",
+        "_state",
+        "_put",
+        "_is_ping_pending",
+    )
+
+    def __init__(self, connection_id, pingee, message_queue, ping_pending):
         self.connection_id = connection_id
         self.pingee = pingee
         self.message_queue = message_queue
+        self.ping_pending = ping_pending
         self._state = _INITIAL
         self.pinger = None
+        self._put = None
+        self._is_ping_pending = None
 
     def start(self):
         """
@@ -101,6 +117,10 @@ class MultithreadingSender:
         self.pinger = self.pingee.pinger()
         self.pinger.connect()
 
+        # Bound methods used on every send.
+        self._put = self.message_queue.put
+        self._is_ping_pending = self.ping_pending.is_set
+
         self._state = _OPEN
 
     def send(self, message):
@@ -126,8 +146,13 @@ class MultithreadingSender:
                 f"state is {self._state}"
             )
 
-        self.message_queue.put((self.connection_id, message))
-        self.pinger.ping()
+        self._put((self.connection_id, message))
+        # The flag must be tested after the put: if the router clears it
+        # before this point, either this message is routed in the current
+        # pass, or we send a fresh ping for it.
+        if not self._is_ping_pending():
+            self.ping_pending.set()
+            self.pinger.ping()
 
     def stop(self):
         """
@@ -149,6 +174,9 @@ class MultithreadingSender:
                 f"state is {self._state}"
             )
 
+        self._put = None
+        self._is_ping_pending = None
+
         self.pinger.disconnect()
         self.pinger = None
 
@@ -206,11 +234,12 @@ class MultithreadingRouter(HasRequiredTraits):
         if self._running:
             raise RuntimeError("router is already running")
 
-        self._message_queue = queue.Queue()
+        self._message_queue = queue.SimpleQueue()
+        self._ping_pending = threading.Event()
         self._link_to_event_loop()
 
         self._running = True
-        logger.debug(f"{self} started")
+        logger.debug("%s started", self)
 
     def stop(self):
         """
@@ -233,14 +262,17 @@ class MultithreadingRouter(HasRequiredTraits):
             raise RuntimeError("router is not running")
 
         if self._receivers:
-            logger.warning(f"{self} has {len(self._receivers)} unclosed pipes")
+            logger.warning(
+                "%s has %s unclosed pipes", self, len(self._receivers)
+            )
 
         self._unlink_from_event_loop()
 
         self._message_queue = None
+        self._ping_pending = None
 
         self._running = False
-        logger.debug(f"{self} stopped")
+        logger.debug("%s stopped", self)
 
     def pipe(self):
         """
@@ -266,16 +298,22 @@ class MultithreadingRouter(HasRequiredTraits):
         if not self._running:
             raise RuntimeError("router is not running")
 
-        connection_id = next(self._connection_ids)
+        connection_id = self._next_connection_id
+        self._next_connection_id = connection_id + 1
+
         sender = MultithreadingSender(
             connection_id=connection_id,
             pingee=self._pingee,
             message_queue=self._message_queue,
+            ping_pending=self._ping_pending,
         )
         receiver = MultithreadingReceiver(connection_id=connection_id)
         self._receivers[connection_id] = receiver
         logger.debug(
-            f"{self} created pipe #{connection_id} with receiver {receiver}"
+            "%s created pipe #%s with receiver %s",
+            self,
+            connection_id,
+            receiver,
         )
         return sender, receiver
 
@@ -304,7 +342,10 @@ class MultithreadingRouter(HasRequiredTraits):
         connection_id = receiver.connection_id
         self._receivers.pop(connection_id)
         logger.debug(
-            f"{self} closed pipe #{connection_id} with receiver {receiver}"
+            "%s closed pipe #%s with receiver %s",
+            self,
+            connection_id,
+            receiver,
         )
 
     def route_until(self, condition, timeout=None):
@@ -339,12 +380,17 @@ class MultithreadingRouter(HasRequiredTraits):
                 self._route_message(block=True)
         else:
             end_time = time.monotonic() + timeout
-            while not condition():
-                try:
-                    time_remaining = end_time - time.monotonic()
-                    self._route_message(block=True, timeout=time_remaining)
-                except queue.Empty:
-                    raise RuntimeError("Timed out waiting for messages")
+            try:
+                while not condition():
+                    # Only consult the clock when we actually need to wait:
+                    # messages that are already queued are routed directly.
+                    try:
+                        self._route_message()
+                    except queue.Empty:
+                        time_remaining = max(end_time - time.monotonic(), 0.0)
+                        self._route_message(block=True, timeout=time_remaining)
+            except queue.Empty:
+                raise RuntimeError("Timed out waiting for messages")
 
     # Public traits ###########################################################
 
@@ -353,18 +399,28 @@ class MultithreadingRouter(HasRequiredTraits):
 
     # Private traits ##########################################################
 
-    #: Internal queue for messages from all senders.
-    _message_queue = Instance(queue.Queue)
+    #: Internal queue for messages from all senders. This is never bounded or
+    #: joined, so the C-implemented SimpleQueue is enough.
+    _message_queue = Instance(queue.SimpleQueue)
 
-    #: Source of new connection ids.
-    _connection_ids = Instance(collections.abc.Iterator)
+    #: Connection id to use for the next pipe created. Ids are never reused:
+    #: messages from a closed pipe may still be in flight, and must be
+    #: discarded rather than delivered to a newer receiver.
+    _next_connection_id = Int(0)
 
-    #: Receivers, keyed by connection_id.
-    _receivers = Dict(Int(), Instance(MultithreadingReceiver))
+    #: Receivers, keyed by connection_id. This is a plain dict rather than a
+    #: Dict trait, to avoid the overhead of trait validation and notification
+    #: on the message routing path.
+    _receivers = Any()
 
     #: Receiver for the "message_sent" signal.
     _pingee = Instance(IPingee)
 
+    #: Event set by a sender when it pings, and cleared when the resulting
+    #: callback starts routing messages. Used to avoid sending redundant
+    #: pings.
+    _ping_pending = Instance(threading.Event)
+
     #: Bool keeping track of whether we're linked to the event loop
     #: or not.
     _linked = Bool(False)
@@ -383,7 +439,9 @@ class MultithreadingRouter(HasRequiredTraits):
             # so if we ever get here then something likely needs fixing.
             raise RuntimeError("Already linked to the event loop")
 
-        self._pingee = self.event_loop.pingee(on_ping=self._route_message)
+        self._pingee = self.event_loop.pingee(
+            on_ping=self._route_pending_messages
+        )
         self._pingee.connect()
         self._linked = True
 
@@ -405,6 +463,31 @@ class MultithreadingRouter(HasRequiredTraits):
             self._pingee.disconnect()
             self._linked = False
 
+    def _route_pending_messages(self):
+        """
+        Dispatch the messages currently in the message queue.
+
+        This is the callback for pings from the senders.
+        """
+        # Clear the flag before routing, so that any message sent from this
+        # point on results in a new ping.
+        self._ping_pending.clear()
+        # Only route the messages present on entry: anything arriving later
+        # has its own ping, and will be handled in a later callback. That
+        # keeps a steady stream of messages from starving the event loop.
+        for _ in range(self._message_queue.qsize()):
+            # A receiver may stop the router, or switch it to manual mode,
+            # while we're routing. If so, leave any remaining messages alone.
+            if not self._linked:
+                break
+            # A receiver may also run a nested event loop (for example, by
+            # showing a modal dialog), which can route the remaining messages
+            # before we get to them.
+            try:
+                self._route_message()
+            except queue.Empty:
+                break
+
     def _route_message(self, *, block=False, timeout=None):
         """
         Get and dispatch a message from the local message queue.
@@ -413,30 +496,32 @@ class MultithreadingRouter(HasRequiredTraits):
         ----------
         block : bool, optional
             If True, block until either a message arrives or until timeout. If
-            False (the default), we expect a message to already be present in
-            the queue.
+            False (the default), raise immediately if there's no message
+            present in the queue.
         timeout : float, optional
-            Maximum time to wait for a message to arrive. If no timeout
-            is given and ``block`` is True, wait indefinitely. If ``block``
-            is False, this parameter is ignored.
+            Maximum time to wait for a message to arrive. Must be
+            non-negative if given. If no timeout is given and ``block`` is
+            True, wait indefinitely. If ``block`` is False, this parameter is
+            ignored.
 
         Raises
         ------
         queue.Empty
-            If no message arrives within the given timeout.
+            If no message is available (when not blocking), or if no message
+            arrives within the given timeout.
         """
         connection_id, message = self._message_queue.get(
-            block=block,
-            timeout=None if timeout is None else max(timeout, 0.0),
+            block=block, timeout=timeout
         )
-        try:
-            receiver = self._receivers[connection_id]
-        except KeyError:
+        receiver = self._receivers.get(connection_id)
+        if receiver is None:
             logger.warning(
-                f"{self} discarding message from closed pipe #{connection_id}."
+                "%s discarding message from closed pipe #%s.",
+                self,
+                connection_id,
             )
         else:
             receiver.message = message
 
-    def __connection_ids_default(self):
-        return itertools.count()
+    def __receivers_default(self):
+        return {}
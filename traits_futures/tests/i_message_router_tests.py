@@ -297,6 +297,14 @@ class IMessageRouterTests:
                 with self.assertRaises(RuntimeError):
                     sender.send("Some message")
 
+    def test_sender_send_after_stop(self):
+        with self.started_router() as router:
+            with self.get_sender(router) as sender:
+                sender.start()
+                sender.stop()
+                with self.assertRaises(RuntimeError):
+                    sender.send("Some message")
+
     def test_sender_start_twice(self):
         with self.started_router() as router:
             with self.get_sender(router) as sender:
@@ -12,11 +12,20 @@
 Tests for the MultiprocessingRouter class.
 """
 
+import contextlib
+import multiprocessing
+import time
 import unittest
 
 from traits_futures.multiprocessing_context import MultiprocessingContext
+from traits_futures.multiprocessing_router import MultiprocessingRouter
 from traits_futures.testing.test_assistant import TestAssistant
-from traits_futures.tests.i_message_router_tests import IMessageRouterTests
+from traits_futures.tests.i_message_router_tests import (
+    IMessageRouterTests,
+    ReceiverListener,
+    SAFETY_TIMEOUT,
+    send_messages,
+)
 
 
 class TestMultiprocessingRouter(
@@ -37,3 +46,182 @@ class TestMultiprocessingRouter(
     def tearDown(self):
         IMessageRouterTests.tearDown(self)
         TestAssistant.tearDown(self)
+
+    def test_bounded_local_queue(self):
+        messages = list(range(20))
+
+        with self.context.worker_pool() as worker_pool:
+            with self.started_custom_router(local_queue_maxsize=2) as router:
+                sender, receiver = router.pipe()
+                listener = ReceiverListener(receiver=receiver)
+
+                worker_pool.submit(send_messages, sender, messages)
+
+                self.assertEventuallyReceives(listener, messages)
+                router.close_pipe(receiver)
+
+    def test_bounded_local_queue_smaller_than_batch(self):
+        # A batch that doesn't fit in the local queue mustn't leave the
+        # monitor thread blocked with no ping sent.
+        messages = list(range(5))
+
+        with self.context.worker_pool() as worker_pool:
+            with self.started_custom_router(
+                local_queue_maxsize=2, sender_batch_size=5
+            ) as router:
+                sender, receiver = router.pipe()
+                listener = ReceiverListener(receiver=receiver)
+
+                worker_pool.submit(send_messages, sender, messages)
+
+                self.assertEventuallyReceives(listener, messages)
+                router.close_pipe(receiver)
+
+    def test_stop_with_full_bounded_local_queue(self):
+        # Without the event loop running, nothing drains the local queue,
+        # so the monitor thread blocks once it's full. Stopping the router
+        # shouldn't hang.
+        with self.started_custom_router(local_queue_maxsize=2) as router:
+            sender, receiver = router.pipe()
+            send_messages(sender, range(10))
+            router.close_pipe(receiver)
+
+    def test_batching_sender(self):
+        # 10 messages in batches of 4 exercises both full batches and the
+        # flush of a partial batch on stop.
+        messages = list(range(10))
+
+        with self.context.worker_pool() as worker_pool:
+            with self.started_custom_router(sender_batch_size=4) as router:
+                sender, receiver = router.pipe()
+                listener = ReceiverListener(receiver=receiver)
+
+                worker_pool.submit(send_messages, sender, messages)
+
+                self.assertEventuallyReceives(listener, messages)
+                router.close_pipe(receiver)
+
+    def test_batching_sender_flush_interval(self):
+        # With a zero flush interval, every send flushes immediately.
+        messages = ["abc", "def"]
+
+        with self.started_custom_router(
+            sender_batch_size=100, sender_flush_interval=0.0
+        ) as router:
+            sender, receiver = router.pipe()
+            listener = ReceiverListener(receiver=receiver)
+
+            sender.start()
+            try:
+                for message in messages:
+                    sender.send(message)
+                self.assertEventuallyReceives(listener, messages)
+            finally:
+                sender.stop()
+            router.close_pipe(receiver)
+
+    def test_batching_sender_holds_messages_until_stop(self):
+        with self.started_custom_router(sender_batch_size=100) as router:
+            sender, receiver = router.pipe()
+            listener = ReceiverListener(receiver=receiver)
+
+            sender.start()
+            try:
+                sender.send("abc")
+                sender.send("def")
+                # The batch isn't full, so nothing has been sent yet.
+                with self.assertRaises(RuntimeError):
+                    router.route_until(lambda: listener.messages, timeout=0.1)
+            finally:
+                sender.stop()
+
+            # Stopping the sender flushes the partial batch.
+            router.route_until(
+                lambda: len(listener.messages) == 2, timeout=SAFETY_TIMEOUT
+            )
+            self.assertEqual(listener.messages, ["abc", "def"])
+            router.close_pipe(receiver)
+
+    def test_batching_sender_flushes_after_interval(self):
+        with self.started_custom_router(
+            sender_batch_size=100, sender_flush_interval=0.5
+        ) as router:
+            sender, receiver = router.pipe()
+            listener = ReceiverListener(receiver=receiver)
+
+            sender.start()
+            try:
+                sender.send("abc")
+                with self.assertRaises(RuntimeError):
+                    router.route_until(lambda: listener.messages, timeout=0.1)
+
+                # Once the interval has elapsed, the next send flushes the
+                # whole batch, without waiting for stop.
+                time.sleep(0.5)
+                sender.send("def")
+                router.route_until(
+                    lambda: len(listener.messages) == 2,
+                    timeout=SAFETY_TIMEOUT,
+                )
+                self.assertEqual(listener.messages, ["abc", "def"])
+            finally:
+                sender.stop()
+            router.close_pipe(receiver)
+
+    def test_empty_batch(self):
+        # A batch holding only a connection id shouldn't disturb the
+        # monitor thread: later messages must still get through.
+        with self.started_custom_router() as router:
+            sender, receiver = router.pipe()
+            listener = ReceiverListener(receiver=receiver)
+
+            router._process_message_queue.put([receiver.connection_id])
+            send_messages(sender, ["abc"])
+
+            self.assertEventuallyReceives(listener, ["abc"])
+            router.close_pipe(receiver)
+
+    def test_reentrant_drain(self):
+        # A receiver's handler may run a nested event loop (for example by
+        # showing a modal dialog), routing the remaining messages before the
+        # outer drain gets to them.
+        with self.started_router() as router:
+            sender, receiver = router.pipe()
+            received = []
+
+            def handler(event):
+                received.append(event.new)
+                if event.new == 1:
+                    router._route_pending_messages()
+
+            receiver.observe(handler, "message")
+            for message in [1, 2, 3]:
+                router._local_message_queue.put(
+                    (receiver.connection_id, message)
+                )
+            router._route_pending_messages()
+
+            self.assertEqual(received, [1, 2, 3])
+            router.close_pipe(receiver)
+
+    # Helper functions ########################################################
+
+    @contextlib.contextmanager
+    def started_custom_router(self, **traits):
+        """
+        Yield an already-started router with the given extra traits.
+        """
+        manager = multiprocessing.Manager()
+        try:
+            router = MultiprocessingRouter(
+                event_loop=self._event_loop,
+                manager=manager,
+                **traits,
+            )
+            router.start()
+            try:
+                yield router
+            finally:
+                router.stop()
+        finally:
+            manager.shutdown()
@@ -37,3 +37,26 @@ class TestMultithreadingRouter(
     def tearDown(self):
         IMessageRouterTests.tearDown(self)
         TestAssistant.tearDown(self)
+
+    def test_reentrant_drain(self):
+        # A receiver's handler may run a nested event loop (for example by
+        # showing a modal dialog), routing the remaining messages before the
+        # outer drain gets to them.
+        with self.started_router() as router:
+            sender, receiver = router.pipe()
+            received = []
+
+            def handler(event):
+                received.append(event.new)
+                if event.new == 1:
+                    sender.send(4)
+                    router._route_pending_messages()
+
+            receiver.observe(handler, "message")
+            with sender:
+                for message in [1, 2, 3]:
+                    sender.send(message)
+                router._route_pending_messages()
+
+            self.assertEqual(received, [1, 2, 3, 4])
+            router.close_pipe(receiver)
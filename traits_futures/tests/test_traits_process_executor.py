@@ -18,6 +18,7 @@ from traits_futures.api import (
     ETSEventLoop,
     MultiprocessingContext,
     MultithreadingContext,
+    submit_iteration,
     TraitsExecutor,
 )
 from traits_futures.testing.test_assistant import TestAssistant
@@ -79,6 +80,48 @@ class TestTraitsExecutorCreation(TestAssistant, unittest.TestCase):
         finally:
             context.close()
 
+    def test_context_with_bounded_local_queue(self):
+        context = MultiprocessingContext(local_queue_maxsize=2)
+        try:
+            with self.temporary_executor(
+                context=context, event_loop=self._event_loop
+            ) as executor:
+                router = executor._message_router
+                self.assertEqual(router.local_queue_maxsize, 2)
+
+                # More messages than the queue can hold still all arrive.
+                results = []
+                future = submit_iteration(executor, range, 20)
+                future.observe(
+                    lambda event: results.append(event.new), "result_event"
+                )
+                self.run_until(future, "done", lambda future: future.done)
+                self.assertEqual(results, list(range(20)))
+        finally:
+            context.close()
+
+    def test_context_with_batching_senders(self):
+        context = MultiprocessingContext(
+            sender_batch_size=4, sender_flush_interval=0.5
+        )
+        try:
+            with self.temporary_executor(
+                context=context, event_loop=self._event_loop
+            ) as executor:
+                router = executor._message_router
+                self.assertEqual(router.sender_batch_size, 4)
+                self.assertEqual(router.sender_flush_interval, 0.5)
+
+                results = []
+                future = submit_iteration(executor, range, 10)
+                future.observe(
+                    lambda event: results.append(event.new), "result_event"
+                )
+                self.run_until(future, "done", lambda future: future.done)
+                self.assertEqual(results, list(range(10)))
+        finally:
+            context.close()
+
     def test_owned_context_closed_at_executor_stop(self):
         with self.temporary_executor(event_loop=self._event_loop) as executor:
             context = executor._context